@@ -1,12 +1,59 @@
-from typing import List, Optional
-
-from pptx import Presentation
-from pptx.util import Inches, Pt
+import asyncio
+import hashlib
+import io
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, ClassVar, Dict, List, Optional, Set, Tuple
 import os
 
+from pydantic import PrivateAttr
+
 from app.tool.base import BaseTool, ToolResult
 from app.config import WORKSPACE_ROOT
 
+# python-pptx 会连带加载 lxml 和大量 XML 模板，延迟到首次使用时再导入
+if TYPE_CHECKING:
+    from pptx.opc.packuri import PackURI
+    from pptx.parts.image import ImagePart
+    from pptx.presentation import Presentation
+    from pptx.slide import SlideLayout
+
+# 最多缓存的图片文件数量
+_IMAGE_FILE_CACHE_SIZE = 32
+
+
+def _cache_next_partnames(package) -> None:
+    """Memoize partname allocation on a freshly created package.
+
+    python-pptx scans every part in the package to find the next free partname,
+    which makes building a deck part by part quadratic. A new presentation has
+    contiguous partnames, so after the first scan per template the next one can
+    simply be incremented.
+    """
+    from pptx.opc.packuri import PackURI
+
+    next_partname = package.next_partname
+    next_image_partname = package.next_image_partname
+    next_idx = {}
+
+    def cached_next_partname(tmpl: str) -> "PackURI":
+        if tmpl in next_idx:
+            next_idx[tmpl] += 1
+        else:
+            next_idx[tmpl] = next_partname(tmpl).idx
+        return PackURI(tmpl % next_idx[tmpl])
+
+    def cached_next_image_partname(ext: str) -> "PackURI":
+        # 图片部件名的序号与扩展名无关，所有图片共用一个计数器
+        if "/ppt/media/image" in next_idx:
+            next_idx["/ppt/media/image"] += 1
+        else:
+            next_idx["/ppt/media/image"] = next_image_partname(ext).idx
+        return PackURI("/ppt/media/image%d.%s" % (next_idx["/ppt/media/image"], ext))
+
+    package.next_partname = cached_next_partname
+    package.next_image_partname = cached_next_image_partname
+
 
 class PPTCreator(BaseTool):
     """A tool for creating PowerPoint presentations."""
@@ -16,18 +63,19 @@ class PPTCreator(BaseTool):
 This tool allows you to create slides, add content, and save presentations to files.
 You can create new presentations, add various types of slides (title, content, etc.),
 and customize text, layouts, and basic formatting.
+Use the add_batch action to add several slides with their text and images in a single call.
 """
     parameters: dict = {
         "type": "object",
         "properties": {
             "action": {
                 "type": "string",
-                "enum": ["create", "add_slide", "add_text", "add_image", "save"],
+                "enum": ["create", "add_slide", "add_text", "add_image", "add_batch", "save"],
                 "description": "The action to perform on the presentation",
             },
             "file_path": {
                 "type": "string",
-                "description": "Path where the presentation should be saved or loaded from",
+                "description": "Path where the presentation should be saved (used with create and save actions)",
             },
             "slide_type": {
                 "type": "string",
@@ -54,13 +102,65 @@ and customize text, layouts, and basic formatting.
                 "type": "string",
                 "description": "Path to the image file to add (used with add_image action)",
             },
+            "slides": {
+                "type": "array",
+                "description": "Slides to append in one call (used with add_batch action)",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "slide_type": {
+                            "type": "string",
+                            "enum": ["title", "content", "two_content", "section", "blank"],
+                            "description": "Type of slide to add",
+                        },
+                        "title": {
+                            "type": "string",
+                            "description": "Title text for the slide",
+                        },
+                        "texts": {
+                            "type": "array",
+                            "description": "Text to add to the slide placeholders",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "placeholder_index": {
+                                        "type": "integer",
+                                        "description": "Index of the placeholder to add text to",
+                                    },
+                                    "content": {
+                                        "type": "string",
+                                        "description": "Content text or bullet points",
+                                    },
+                                },
+                                "required": ["content"],
+                            },
+                        },
+                        "images": {
+                            "type": "array",
+                            "description": "Paths to image files to add to the slide",
+                            "items": {"type": "string"},
+                        },
+                    },
+                    "required": ["slide_type"],
+                },
+            },
         },
         "required": ["action"],
     }
 
-    # 存储当前正在处理的演示文稿
-    _current_presentation: Optional[Presentation] = None
+    # 存储当前正在处理的演示文稿（pydantic 私有属性，每个工具实例各自持有一份）
+    _current_presentation: Optional["Presentation"] = None
     _current_file_path: Optional[str] = None
+    # 按图片内容的 SHA-256 缓存已嵌入的图片部件，避免重复嵌入同一张图片
+    _image_cache: Dict[str, "ImagePart"] = {}
+    # 按 (路径, 修改时间) 缓存当前演示文稿最近读取的图片文件内容及其 SHA-256，避免重复读盘和计算哈希
+    _image_file_cache: "OrderedDict[Tuple[str, int], Tuple[bytes, str]]" = OrderedDict()
+    # 当前演示文稿中按幻灯片类型缓存的布局对象
+    _layout_cache: Dict[str, "SlideLayout"] = {}
+    # python-pptx 的对象模型不是并发安全的，同一时间只允许一个操作修改演示文稿
+    _lock: asyncio.Lock = PrivateAttr(default_factory=asyncio.Lock)
+    # 已经确认存在的输出目录，避免每次保存都重复检查
+    _ensured_dirs: Set[str] = set()
 
     # 幻灯片布局索引映射
     _slide_layouts = {
@@ -71,61 +171,81 @@ and customize text, layouts, and basic formatting.
         "blank": 5,        # 空白幻灯片
     }
 
-    async def execute(
-        self,
-        action: str,
-        file_path: Optional[str] = None,
-        slide_type: Optional[str] = None,
-        title: Optional[str] = None,
-        content: Optional[str] = None,
-        slide_index: Optional[int] = None,
-        placeholder_index: Optional[int] = None,
-        image_path: Optional[str] = None,
-        **kwargs
-    ) -> ToolResult:
-        """Execute the PPT creation tool with the specified parameters."""
+    # 操作名 -> (处理方法名, 参数名, 是否放到线程中执行)
+    _action_handlers: ClassVar[Dict[str, Tuple[str, Tuple[str, ...], bool]]] = {
+        # 首次创建时才导入 python-pptx 并加载默认模板，放到线程中执行
+        "create": ("_create_presentation", ("file_path",), True),
+        "add_slide": ("_add_slide", ("slide_type", "title"), False),
+        "add_text": ("_add_text", ("slide_index", "placeholder_index", "content"), False),
+        # 读取图片文件是阻塞操作，放到线程中执行
+        "add_image": ("_add_image", ("slide_index", "image_path"), True),
+        # 整批幻灯片在一个线程中同步构建，避免逐页往返事件循环
+        "add_batch": ("_add_batch", ("slides",), True),
+        # 创建目录、序列化并写入磁盘都是阻塞操作，放到线程中执行
+        "save": ("_save_presentation", ("file_path",), True),
+    }
 
-        try:
-            # 处理文件路径
-            if file_path:
-                if os.path.isabs(file_path):
-                    file_name = os.path.basename(file_path)
-                    full_path = os.path.join(WORKSPACE_ROOT, file_name)
-                else:
-                    full_path = os.path.join(WORKSPACE_ROOT, file_path)
-
-                # 确保目录存在
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-
-                # 更新当前文件路径
-                self._current_file_path = full_path
-
-            # 根据不同操作执行相应功能
-            if action == "create":
-                return await self._create_presentation(file_path)
-            elif action == "add_slide":
-                return await self._add_slide(slide_type, title)
-            elif action == "add_text":
-                return await self._add_text(slide_index, placeholder_index, content)
-            elif action == "add_image":
-                return await self._add_image(slide_index, image_path)
-            elif action == "save":
-                return await self._save_presentation()
-            else:
-                return ToolResult(error=f"Unknown action: {action}")
+    async def execute(self, action: str, **kwargs) -> ToolResult:
+        """Execute the PPT creation tool with the specified parameters."""
+        handler = self._action_handlers.get(action)
+        if handler is None:
+            return ToolResult(error=f"Unknown action: {action}")
 
-        except Exception as e:
-            return ToolResult(error=f"Error in PPT creation: {str(e)}")
+        # 每次调用时按名称取绑定方法，复制出的工具实例会操作自己的演示文稿
+        method_name, arg_names, in_thread = handler
+        method = getattr(self, method_name)
+        args = [kwargs.get(name) for name in arg_names]
 
-    async def _create_presentation(self, file_path: Optional[str]) -> ToolResult:
+        async with self._lock:
+            try:
+                if in_thread:
+                    return await self._run_in_thread(method, *args)
+                return method(*args)
+            except Exception as e:
+                return ToolResult(error=f"Error in PPT creation: {str(e)}")
+
+    @staticmethod
+    async def _run_in_thread(method: Callable[..., ToolResult], *args) -> ToolResult:
+        """Run a method in a worker thread, waiting for it to finish even if cancelled."""
+        future = asyncio.ensure_future(asyncio.to_thread(method, *args))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # 线程无法被取消，等它结束后再让调用方释放锁，避免与下一次操作并发修改演示文稿
+            while not future.done():
+                try:
+                    await asyncio.wait({future})
+                except asyncio.CancelledError:
+                    pass
+            if not future.cancelled():
+                future.exception()
+            raise
+
+    @staticmethod
+    def _resolve_file_path(file_path: str) -> str:
+        """Resolve the presentation file path inside the workspace."""
+        if os.path.isabs(file_path):
+            return os.path.join(WORKSPACE_ROOT, os.path.basename(file_path))
+        return os.path.join(WORKSPACE_ROOT, file_path)
+
+    def _create_presentation(self, file_path: Optional[str]) -> ToolResult:
         """Create a new presentation."""
+        from pptx import Presentation
+
         self._current_presentation = Presentation()
+        _cache_next_partnames(self._current_presentation.part.package)
+        self._image_cache = {}
+        self._image_file_cache = OrderedDict()
+        self._layout_cache = {
+            name: self._current_presentation.slide_layouts[idx]
+            for name, idx in self._slide_layouts.items()
+        }
         if file_path:
-            self._current_file_path = self._current_file_path or file_path
+            self._current_file_path = self._resolve_file_path(file_path)
 
         return ToolResult(output="New presentation created successfully.")
 
-    async def _add_slide(self, slide_type: Optional[str], title: Optional[str]) -> ToolResult:
+    def _add_slide(self, slide_type: Optional[str], title: Optional[str]) -> ToolResult:
         """Add a new slide to the presentation."""
         if not self._current_presentation:
             return ToolResult(error="No active presentation. Use 'create' action first.")
@@ -134,8 +254,7 @@ and customize text, layouts, and basic formatting.
             return ToolResult(error=f"Invalid slide type: {slide_type}")
 
         # 获取布局并添加幻灯片
-        layout_idx = self._slide_layouts[slide_type]
-        slide_layout = self._current_presentation.slide_layouts[layout_idx]
+        slide_layout = self._layout_cache[slide_type]
         slide = self._current_presentation.slides.add_slide(slide_layout)
 
         # 如果提供了标题且幻灯片有标题占位符，则添加标题
@@ -144,7 +263,7 @@ and customize text, layouts, and basic formatting.
 
         return ToolResult(output=f"Added new {slide_type} slide with index {len(self._current_presentation.slides) - 1}")
 
-    async def _add_text(
+    def _add_text(
         self, slide_index: Optional[int], placeholder_index: Optional[int], content: Optional[str]
     ) -> ToolResult:
         """Add text to a slide placeholder."""
@@ -168,15 +287,29 @@ and customize text, layouts, and basic formatting.
             except (IndexError, KeyError):
                 return ToolResult(error=f"Placeholder {placeholder_index} not found on slide {slide_index}")
 
-        # 否则，尝试添加到第一个文本框或内容占位符
+        # 否则，优先直接写入内容占位符（idx 1），无需遍历幻灯片上的所有形状
+        try:
+            slide.placeholders[1].text = content
+            return ToolResult(output=f"Added text to slide {slide_index}")
+        except KeyError:
+            pass
+
+        # 没有内容占位符时，退回到第一个可写文本的形状
         for shape in slide.shapes:
-            if hasattr(shape, "text"):
+            if shape.has_text_frame:
                 shape.text = content
                 return ToolResult(output=f"Added text to slide {slide_index}")
 
         return ToolResult(error=f"No suitable text placeholder found on slide {slide_index}")
 
-    async def _add_image(self, slide_index: Optional[int], image_path: Optional[str]) -> ToolResult:
+    @staticmethod
+    def _resolve_image_path(image_path: str) -> str:
+        """Resolve an image path, treating relative paths as relative to the workspace."""
+        if os.path.isabs(image_path):
+            return image_path
+        return os.path.join(WORKSPACE_ROOT, image_path)
+
+    def _add_image(self, slide_index: Optional[int], image_path: Optional[str]) -> ToolResult:
         """Add an image to a slide."""
         if not self._current_presentation:
             return ToolResult(error="No active presentation. Use 'create' action first.")
@@ -187,34 +320,145 @@ and customize text, layouts, and basic formatting.
         if not image_path:
             return ToolResult(error="No image path provided")
 
-        # 处理图片路径
-        if os.path.isabs(image_path):
-            full_image_path = image_path
-        else:
-            full_image_path = os.path.join(WORKSPACE_ROOT, image_path)
-
+        full_image_path = self._resolve_image_path(image_path)
         if not os.path.exists(full_image_path):
             return ToolResult(error=f"Image file not found: {full_image_path}")
 
         slide = self._current_presentation.slides[slide_index]
 
+        from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+        from pptx.util import Inches
+
         # 添加图片到幻灯片
         try:
-            slide.shapes.add_picture(
-                full_image_path,
-                left=Inches(1),
-                top=Inches(2),
-                width=Inches(4)
-            )
+            image_blob, digest = self._read_image_file(full_image_path)
+            try:
+                image_part = self._get_or_add_image_part(image_blob, digest, full_image_path)
+                rId = slide.part.relate_to(image_part, RT.IMAGE)
+                slide.shapes._add_pic_from_image_part(
+                    image_part, rId, Inches(1), Inches(2), Inches(4), None
+                )
+            except (AttributeError, ImportError):
+                # 依赖的 python-pptx 内部接口不可用时退回公开 API，由 python-pptx 自行按 SHA-1 去重
+                slide.shapes.add_picture(
+                    io.BytesIO(image_blob), left=Inches(1), top=Inches(2), width=Inches(4)
+                )
             return ToolResult(output=f"Added image to slide {slide_index}")
         except Exception as e:
             return ToolResult(error=f"Error adding image: {str(e)}")
 
-    async def _save_presentation(self) -> ToolResult:
+    def _add_batch(self, slides: Optional[List[dict]]) -> ToolResult:
+        """Add several slides, along with their text and images, in one pass."""
+        if not self._current_presentation:
+            return ToolResult(error="No active presentation. Use 'create' action first.")
+
+        if not slides:
+            return ToolResult(error="No slides provided")
+
+        # 先校验所有条目，避免中途失败留下只构建了一半的演示文稿
+        error = self._validate_batch(slides)
+        if error:
+            return ToolResult(error=f"{error}. No slides were added.")
+
+        outputs = []
+        first_index = len(self._current_presentation.slides)
+        for entry_index, spec in enumerate(slides):
+            results = [self._add_slide(spec["slide_type"], spec.get("title"))]
+            if not results[0].error:
+                slide_index = len(self._current_presentation.slides) - 1
+                for text in spec.get("texts") or []:
+                    results.append(
+                        self._add_text(slide_index, text.get("placeholder_index"), text["content"])
+                    )
+                for image_path in spec.get("images") or []:
+                    results.append(self._add_image(slide_index, image_path))
+
+            for result in results:
+                if result.error:
+                    # 错误信息中写明失败的条目和已添加的幻灯片，避免重发整批导致重复
+                    added = len(self._current_presentation.slides) - first_index
+                    return ToolResult(
+                        error=f"Slide entry {entry_index} failed: {result.error}. "
+                        f"{added} slide(s) from this batch were already added "
+                        f"starting at index {first_index}; do not add them again."
+                    )
+                outputs.append(result.output)
+
+        return ToolResult(output="\n".join(outputs))
+
+    def _validate_batch(self, slides: list) -> Optional[str]:
+        """Return an error message for the first invalid batch entry, or None if all are valid."""
+        if not isinstance(slides, list):
+            return "slides must be a list"
+
+        for entry_index, spec in enumerate(slides):
+            if not isinstance(spec, dict):
+                return f"Slide entry {entry_index} must be an object"
+            slide_type = spec.get("slide_type")
+            if not isinstance(slide_type, str) or slide_type not in self._slide_layouts:
+                return f"Slide entry {entry_index} has invalid slide type: {slide_type}"
+            if spec.get("title") is not None and not isinstance(spec["title"], str):
+                return f"Slide entry {entry_index} title must be a string"
+
+            texts = spec.get("texts") or []
+            if not isinstance(texts, list):
+                return f"Slide entry {entry_index} texts must be a list"
+            for text in texts:
+                if not isinstance(text, dict) or not text.get("content"):
+                    return f"Slide entry {entry_index} has a text without content"
+                if not isinstance(text["content"], str):
+                    return f"Slide entry {entry_index} text content must be a string"
+                placeholder_index = text.get("placeholder_index")
+                if placeholder_index is not None and (
+                    not isinstance(placeholder_index, int) or isinstance(placeholder_index, bool)
+                ):
+                    return f"Slide entry {entry_index} placeholder_index must be an integer"
+
+            images = spec.get("images") or []
+            if not isinstance(images, list):
+                return f"Slide entry {entry_index} images must be a list"
+            for image_path in images:
+                if not isinstance(image_path, str) or not image_path:
+                    return f"Slide entry {entry_index} has an invalid image path"
+                if not os.path.exists(self._resolve_image_path(image_path)):
+                    return f"Slide entry {entry_index} image file not found: {image_path}"
+
+        return None
+
+    def _read_image_file(self, image_path: str) -> Tuple[bytes, str]:
+        """Return the contents and SHA-256 digest of an image file, reusing a recent read."""
+        key = (image_path, os.stat(image_path).st_mtime_ns)
+        cached = self._image_file_cache.get(key)
+        if cached is not None:
+            self._image_file_cache.move_to_end(key)
+            return cached
+
+        image_blob = Path(image_path).read_bytes()
+        cached = (image_blob, hashlib.sha256(image_blob).hexdigest())
+        self._image_file_cache[key] = cached
+        if len(self._image_file_cache) > _IMAGE_FILE_CACHE_SIZE:
+            self._image_file_cache.popitem(last=False)
+        return cached
+
+    def _get_or_add_image_part(self, image_blob: bytes, digest: str, image_path: str) -> "ImagePart":
+        """Return the image part for the given image, reusing an identical one if already embedded."""
+        from pptx.parts.image import Image, ImagePart
+
+        image_part = self._image_cache.get(digest)
+        if image_part is None:
+            image = Image.from_blob(image_blob, os.path.basename(image_path))
+            image_part = ImagePart.new(self._current_presentation.part.package, image)
+            self._image_cache[digest] = image_part
+        return image_part
+
+    def _save_presentation(self, file_path: Optional[str]) -> ToolResult:
         """Save the presentation to a file."""
         if not self._current_presentation:
             return ToolResult(error="No active presentation. Use 'create' action first.")
 
+        if file_path:
+            self._current_file_path = self._resolve_file_path(file_path)
+
         if not self._current_file_path:
             return ToolResult(error="No file path specified for saving")
 
@@ -223,8 +467,18 @@ and customize text, layouts, and basic formatting.
             self._current_file_path += '.pptx'
 
         # 保存演示文稿
+        directory = os.path.dirname(self._current_file_path)
         try:
+            # 只在真正写文件时确保目录存在
+            if directory not in self._ensured_dirs:
+                os.makedirs(directory, exist_ok=True)
+                self._ensured_dirs.add(directory)
+
+            # 传入文件路径（而不是内存缓冲区）时，python-pptx 会直接打开目标 zip 文件并逐个部件
+            # 序列化写入，峰值内存只取决于最大的单个部件，因此这里不要改成先写入 BytesIO。
             self._current_presentation.save(self._current_file_path)
             return ToolResult(output=f"Presentation saved to {self._current_file_path}")
         except Exception as e:
+            # 目录可能已被删除，下次保存时重新创建
+            self._ensured_dirs.discard(directory)
             return ToolResult(error=f"Error saving presentation: {str(e)}")
@@ -33,6 +33,7 @@ setup(
         "aiofiles~=24.1.0",
         "pydantic_core>=2.27.2,<2.28.0",
         "colorama~=0.4.6",
+        "python-pptx~=1.0.2",
     ],
     classifiers=[
         "Programming Language :: Python :: 3",
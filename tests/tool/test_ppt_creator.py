@@ -0,0 +1,209 @@
+import asyncio
+import copy
+import shutil
+import threading
+import zipfile
+from pathlib import Path
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+from app.tool import ppt_creator
+from app.tool.ppt_creator import PPTCreator
+
+
+@pytest.fixture(scope="function")
+def workspace(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Points the PPT tool at a temporary workspace."""
+    monkeypatch.setattr(ppt_creator, "WORKSPACE_ROOT", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_add_image_deduplicates_identical_images(workspace: Path):
+    """Tests that identical image content is embedded only once."""
+    image_path = workspace / "logo.png"
+    Image.new("RGB", (16, 16), "red").save(image_path)
+    copy_path = workspace / "logo_copy.png"
+    shutil.copy(image_path, copy_path)
+
+    tool = PPTCreator()
+    assert not (await tool.execute(action="create", file_path="deck.pptx")).error
+    assert not (await tool.execute(action="add_slide", slide_type="blank")).error
+    assert not (await tool.execute(action="add_slide", slide_type="blank")).error
+    for slide_index, path in [(0, image_path), (0, image_path), (1, copy_path)]:
+        result = await tool.execute(
+            action="add_image", slide_index=slide_index, image_path=str(path)
+        )
+        assert not result.error
+
+    result = await tool.execute(action="save")
+    assert not result.error
+
+    deck_path = workspace / "deck.pptx"
+    with zipfile.ZipFile(deck_path) as zf:
+        media = [name for name in zf.namelist() if name.startswith("ppt/media/image")]
+    assert len(media) == 1
+
+    presentation = Presentation(str(deck_path))
+    pictures = [
+        shape
+        for slide in presentation.slides
+        for shape in slide.shapes
+        if shape.shape_type == MSO_SHAPE_TYPE.PICTURE
+    ]
+    assert len(pictures) == 3
+
+
+@pytest.mark.asyncio
+async def test_add_batch_rejects_invalid_entry_before_adding_slides(workspace: Path):
+    """Tests that an invalid batch entry is reported without building part of the deck."""
+    tool = PPTCreator()
+    assert not (await tool.execute(action="create", file_path="deck.pptx")).error
+
+    result = await tool.execute(
+        action="add_batch",
+        slides=[
+            {"slide_type": "content", "title": "A"},
+            {"slide_type": "content", "title": "B", "texts": [{"content": ""}]},
+            {"slide_type": "title"},
+        ],
+    )
+
+    assert "Slide entry 1" in str(result)
+    assert len(tool._current_presentation.slides) == 0
+
+
+@pytest.mark.asyncio
+async def test_copied_tool_operates_on_its_own_presentation(workspace: Path):
+    """Tests that actions on a copied tool do not touch the original instance."""
+    tool = PPTCreator()
+    tool_copy = copy.deepcopy(tool)
+
+    assert not (await tool_copy.execute(action="create")).error
+
+    assert tool_copy._current_presentation is not None
+    assert tool._current_presentation is None
+
+
+@pytest.mark.asyncio
+async def test_add_image_allocates_distinct_partnames(workspace: Path):
+    """Tests that distinct images across slides get distinct media partnames."""
+    image_paths = []
+    for i, color in enumerate(["red", "green", "blue", "yellow", "purple"]):
+        image_path = workspace / f"image_{i}.{'png' if i % 2 == 0 else 'jpg'}"
+        Image.new("RGB", (16, 16), color).save(image_path)
+        image_paths.append(image_path)
+
+    tool = PPTCreator()
+    assert not (await tool.execute(action="create", file_path="deck.pptx")).error
+    for _ in range(3):
+        assert not (await tool.execute(action="add_slide", slide_type="blank")).error
+    for i, image_path in enumerate(image_paths):
+        result = await tool.execute(
+            action="add_image", slide_index=i % 3, image_path=str(image_path)
+        )
+        assert not result.error
+    assert not (await tool.execute(action="save")).error
+
+    deck_path = workspace / "deck.pptx"
+    with zipfile.ZipFile(deck_path) as zf:
+        names = zf.namelist()
+    media = [name for name in names if name.startswith("ppt/media/image")]
+    assert len(names) == len(set(names))
+    assert sorted(media) == [
+        "ppt/media/image1.png",
+        "ppt/media/image2.jpg",
+        "ppt/media/image3.png",
+        "ppt/media/image4.jpg",
+        "ppt/media/image5.png",
+    ]
+
+    presentation = Presentation(str(deck_path))
+    assert len(presentation.slides) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "slide_type, expected_texts",
+    [
+        # Content slide keeps its title and fills the body placeholder
+        ("content", ["Title", "Body"]),
+        # Title slide fills the subtitle
+        ("title", ["Title", "Body"]),
+        # Layout without an idx 1 placeholder falls back to the first text shape
+        ("blank", ["Body"]),
+    ],
+)
+async def test_add_text_without_placeholder_index(
+    workspace: Path, slide_type: str, expected_texts: list
+):
+    """Tests where text goes when no placeholder index is given."""
+    tool = PPTCreator()
+    assert not (await tool.execute(action="create")).error
+    result = await tool.execute(action="add_slide", slide_type=slide_type, title="Title")
+    assert not result.error
+
+    result = await tool.execute(action="add_text", slide_index=0, content="Body")
+    assert not result.error
+
+    slide = tool._current_presentation.slides[0]
+    texts = [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+    assert texts == expected_texts
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "entry",
+    [
+        {"slide_type": ["content"]},
+        {"slide_type": "content", "title": 1},
+        {"slide_type": "content", "texts": [{"content": "Body", "placeholder_index": "1"}]},
+    ],
+)
+async def test_add_batch_rejects_invalid_field_types(workspace: Path, entry: dict):
+    """Tests that badly typed batch fields are reported with their entry index."""
+    tool = PPTCreator()
+    assert not (await tool.execute(action="create")).error
+
+    result = await tool.execute(
+        action="add_batch", slides=[{"slide_type": "content"}, entry]
+    )
+
+    assert str(result).startswith("Error: Slide entry 1")
+    assert len(tool._current_presentation.slides) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_holds_lock_until_thread_finishes(
+    workspace: Path, monkeypatch: pytest.MonkeyPatch
+):
+    """Tests that cancelling a threaded action keeps the lock until the worker finishes."""
+    started = threading.Event()
+    release = threading.Event()
+    add_batch = PPTCreator._add_batch
+
+    def slow_add_batch(self, slides):
+        started.set()
+        release.wait(timeout=5)
+        return add_batch(self, slides)
+
+    monkeypatch.setattr(PPTCreator, "_add_batch", slow_add_batch)
+
+    tool = PPTCreator()
+    assert not (await tool.execute(action="create")).error
+    task = asyncio.create_task(
+        tool.execute(action="add_batch", slides=[{"slide_type": "title"}])
+    )
+    await asyncio.to_thread(started.wait, 5)
+    task.cancel()
+    await asyncio.sleep(0.05)
+    assert tool._lock.locked()
+
+    release.set()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert not tool._lock.locked()
+    assert len(tool._current_presentation.slides) == 1